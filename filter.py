@@ -2,10 +2,17 @@
 # -*- coding: utf-8 -*-
 
 import argparse
-import csv
+import importlib.util
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import List, Optional
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pv
+import pyarrow.ipc as ipc
+import pyarrow.parquet as pq
 
 # Метрики, по которым проверяем, что строка не полностью пустая
 METRICS_COLS: List[str] = [
@@ -29,6 +36,38 @@ TIME_COLS = [
 POLLED_COLS = [f"{c}_polled" for c in TIME_COLS]
 YMD_COLS = ["release_year", "release_month", "release_day"]
 
+# Текстовые столбцы читаем строго как строки, чтобы Arrow не угадывал даты/таймстемпы
+TEXT_COLS = [
+    "name", "type", "platform", "genres", "developer", "publisher",
+    "release_date", "release_precision", "source_url", "crawled_at",
+]
+
+# Фиксированная схема для потокового чтения: Arrow выводит типы по первому блоку,
+# а дальше любой блок с другой картиной пропусков сломал бы чтение.
+ARROW_COLUMN_TYPES = {
+    "id": pa.int64(),
+    **{c: pa.int64() for c in YMD_COLS + POLLED_COLS},
+    **{c: pa.float64() for c in TIME_COLS},
+    **{c: pa.string() for c in TEXT_COLS},
+}
+
+# Те же типы для движка pandas: парсер сразу строит nullable-столбцы,
+# без повторного pd.to_numeric(...).astype("Int64") — чтобы не было 2015.0 и 90.0.
+PANDAS_DTYPES = {
+    "id": "Int64",
+    **{c: "Int64" for c in YMD_COLS + POLLED_COLS},
+    **{c: "Float64" for c in TIME_COLS},
+    # текст тоже фиксируем: иначе чанк с одними годами в release_date придёт как int64
+    **{c: "string" for c in TEXT_COLS},
+}
+
+# Размер блока (= RecordBatch) для многопоточного CSV-парсера PyArrow
+ARROW_BLOCK_SIZE = 16 << 20
+ARROW_WRITE_OPTIONS = pv.WriteOptions(quoting_style="all_valid")
+
+# Форматы выгрузки: CSV для совместимости, Parquet/Feather (zstd) — быстрые бинарные
+OUTPUT_SUFFIXES = {"csv": ".csv", "parquet": ".parquet", "feather": ".feather"}
+
 # Словари нормализации (пример)
 PLATFORM_MAP = {
     "PC": "PC",
@@ -48,113 +87,264 @@ GENRE_MAP = {
 }
 
 
-def normalize_list_field(val: object, mapping: dict) -> str:
-    """Нормализует поле со списком значений через запятую."""
-    if pd.isna(val):
-        return ""
-    parts = [p.strip() for p in str(val).split(",") if p.strip()]
-    norm_parts = []
-    for p in parts:
-        norm_parts.append(mapping.get(p, p))
-    return ", ".join(sorted(set(norm_parts)))
+def normalize_list_values(arr: pa.Array, mapping: dict) -> pa.Array:
+    """Нормализует массив полей со списком значений через запятую.
 
+    Разбиение, strip, маппинг, сортировка, дедуп и склейка выполняются
+    ядрами pyarrow.compute — без Python-цикла по строкам.
+    """
+    lists = pc.split_pattern(arr, ",")
+    rows = pc.list_parent_indices(lists)
+    vals = pc.utf8_trim_whitespace(pc.list_flatten(lists))
+    keep = pc.not_equal(vals, "")
+    rows = rows.filter(keep)
+    vals = vals.filter(keep)
 
-def normalize_platforms_series(series: pd.Series) -> pd.Series:
-    return series.apply(lambda v: normalize_list_field(v, PLATFORM_MAP))
+    keys = pa.array(list(mapping.keys()), type=pa.string())
+    targets = pa.array(list(mapping.values()), type=pa.string())
+    idx = pc.index_in(vals, value_set=keys)
+    vals = pc.if_else(pc.is_null(idx), vals, pc.take(targets, idx))
 
+    order = pc.sort_indices(
+        pa.table({"row": rows, "val": vals}),
+        sort_keys=[("row", "ascending"), ("val", "ascending")],
+    )
+    rows = rows.take(order).to_numpy()
+    vals = vals.take(order)
+    if len(rows) > 1:
+        # после сортировки дубликаты внутри строки стоят рядом
+        first = np.ones(len(rows), dtype=bool)
+        first[1:] = (rows[1:] != rows[:-1]) | pc.not_equal(vals[1:], vals[:-1]).to_numpy(zero_copy_only=False)
+        rows = rows[first]
+        vals = vals.filter(pa.array(first))
+
+    offsets = np.concatenate(([0], np.cumsum(np.bincount(rows, minlength=len(arr))))).astype(np.int32)
+    return pc.binary_join(pa.ListArray.from_arrays(pa.array(offsets), vals), ", ")
 
-def normalize_genres_series(series: pd.Series) -> pd.Series:
-    return series.apply(lambda v: normalize_list_field(v, GENRE_MAP))
 
+def normalize_list_field_array(arr: pa.Array, mapping: dict) -> pa.Array:
+    """Нормализует столбец, обрабатывая каждое различное значение один раз.
 
-def coerce_dtypes_inplace(df: pd.DataFrame) -> None:
-    """Приводим типы, чтобы не было 2015.0 и 90.0."""
-    if "id" in df.columns:
-        df["id"] = pd.to_numeric(df["id"], errors="coerce").astype("Int64")
-    for c in YMD_COLS:
-        if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors="coerce").astype("Int64")
-    for c in POLLED_COLS:
-        if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors="coerce").astype("Int64")
-    for c in TIME_COLS:
-        if c in df.columns:
-            df[c] = pd.to_numeric(df[c], errors="coerce")
+    Платформ и жанров на порядки меньше, чем строк, поэтому считаем результат
+    по словарю уникальных значений и раскладываем обратно через take.
+    """
+    encoded = pc.dictionary_encode(arr)
+    normalized = normalize_list_values(encoded.dictionary, mapping).take(encoded.indices)
+    return pc.fill_null(normalized, "")
 
 
-def filter_dataframe(df: pd.DataFrame) -> tuple[pd.DataFrame, int, int, List[str]]:
+def normalize_list_field_series(series: pd.Series, mapping: dict) -> pd.Series:
+    arr = pa.array(series.astype("string"), type=pa.string(), from_pandas=True)
+    if isinstance(arr, pa.ChunkedArray):  # string-столбец на pyarrow-хранилище приходит кусками
+        arr = arr.combine_chunks()
+    joined = normalize_list_field_array(arr, mapping)
+    return pd.Series(joined.to_numpy(zero_copy_only=False), index=series.index, dtype="string")
+
+
+def normalize_platforms_series(series: pd.Series) -> pd.Series:
+    return normalize_list_field_series(series, PLATFORM_MAP)
+
+
+def normalize_genres_series(series: pd.Series) -> pd.Series:
+    return normalize_list_field_series(series, GENRE_MAP)
+
+
+def filter_dataframe(df: pd.DataFrame) -> tuple[pd.DataFrame, int, int]:
     """Удаляет строки, где все метрики пустые, и убирает служебные столбцы."""
     missing = [c for c in METRICS_COLS if c not in df.columns]
     if missing:
         raise ValueError(f"Отсутствуют столбцы: {missing}")
     before = len(df)
-    sub = df[METRICS_COLS].copy()
+    # Маску копим по столбцам в одном bool-массиве, без NxK-фрейма и копии METRICS_COLS;
+    # как только пустых строк не осталось, остальные столбцы не смотрим.
+    mask_all_empty = np.ones(len(df), dtype=bool)
     for c in METRICS_COLS:
-        s = sub[c]
-        if pd.api.types.is_string_dtype(s) or s.dtype == object:
-            sub[c] = s.astype("string").str.strip().replace("", pd.NA)
-    mask_all_empty = sub.isna().all(axis=1)
-    df = df.loc[~mask_all_empty].copy()
+        s = df[c]
+        # Строковую очистку гоняем только там, где есть непустые нечисловые значения;
+        # числовым и полностью пустым object-столбцам хватает isna().
+        if (s.dtype == object or pd.api.types.is_string_dtype(s)) and s.notna().any():
+            col_empty = s.astype("string").str.strip().fillna("").eq("")
+        else:
+            col_empty = s.isna()
+        mask_all_empty &= col_empty.to_numpy(dtype=bool)
+        if not mask_all_empty.any():
+            break
+    # Строки и служебные столбцы отбрасываем одной выборкой, без отдельного drop()
+    keep_cols = [c for c in df.columns if c not in SERVICE_COLS]
+    df = df.loc[~mask_all_empty, keep_cols]
     after = len(df)
-    present_to_drop = [c for c in SERVICE_COLS if c in df.columns]
-    df.drop(columns=SERVICE_COLS, errors="ignore", inplace=True)
-    return df, before, after, present_to_drop
-
-
-def write_csv(df: pd.DataFrame, path: Path) -> None:
-    df.to_csv(
-        path,
-        index=False,
-        quoting=csv.QUOTE_ALL,
-        lineterminator="\n",
-        encoding="utf-8",
-        na_rep=""
+    return df, before, after
+
+
+def frame_to_table(df: pd.DataFrame, schema: Optional[pa.Schema] = None) -> pa.Table:
+    # Известные столбцы приводим к ARROW_COLUMN_TYPES (колонка, целиком пустая в чанке, не должна
+    # менять тип), остальные Arrow выводит сам. Pandas-метаданные не пишем: вывод не зависит от --engine.
+    table = pa.Table.from_pandas(df, preserve_index=False).replace_schema_metadata(None)
+    if schema is None:
+        schema = pa.schema([(f.name, ARROW_COLUMN_TYPES.get(f.name, f.type)) for f in table.schema])
+    return table.cast(schema)
+
+
+def open_writer(path: Path, schema: pa.Schema, fmt: str):
+    """Потоковый писатель батчей в нужном формате."""
+    if fmt == "parquet":
+        return pq.ParquetWriter(path, schema, compression="zstd")
+    if fmt == "feather":
+        return ipc.new_file(path, schema, options=ipc.IpcWriteOptions(compression="zstd"))
+    return pv.CSVWriter(path, schema, write_options=ARROW_WRITE_OPTIONS)
+
+
+def normalize_batch(batch: pa.RecordBatch) -> pa.RecordBatch:
+    """Нормализует platform/genres в одном RecordBatch."""
+    arrays = list(batch.columns)
+    for col, mapping in (("platform", PLATFORM_MAP), ("genres", GENRE_MAP)):
+        idx = batch.schema.get_field_index(col)
+        if idx != -1:
+            arrays[idx] = normalize_list_field_array(arrays[idx], mapping)
+    return pa.RecordBatch.from_arrays(arrays, schema=batch.schema)
+
+
+def nonempty_metrics_mask(batch: pa.RecordBatch) -> pa.Array:
+    """True для строк, где заполнена хотя бы одна метрика."""
+    names = batch.schema.names
+    missing = [c for c in METRICS_COLS if c not in names]
+    if missing:
+        raise ValueError(f"Отсутствуют столбцы: {missing}")
+    mask = pc.is_valid(batch.column(METRICS_COLS[0]))
+    for c in METRICS_COLS[1:]:
+        if pc.all(mask).as_py():
+            break
+        mask = pc.or_(mask, pc.is_valid(batch.column(c)))
+    return mask
+
+
+def run_pyarrow(src: Path, p_norm: Path, p_filt: Path, fmt: str = "csv") -> tuple[int, int]:
+    """Один потоковый проход: читаем батч, нормализуем и пишем сразу в оба файла."""
+    reader = pv.open_csv(
+        src,
+        read_options=pv.ReadOptions(block_size=ARROW_BLOCK_SIZE),
+        convert_options=pv.ConvertOptions(column_types=ARROW_COLUMN_TYPES, strings_can_be_null=True),
     )
+    schema = reader.schema
+    keep_cols = [c for c in schema.names if c not in SERVICE_COLS]
+    filt_schema = pa.schema([schema.field(c) for c in keep_cols])
+
+    before = after = 0
+    with open_writer(p_norm, schema, fmt) as w_norm, \
+         open_writer(p_filt, filt_schema, fmt) as w_filt:
+        # Запись батча в нормализованный файл (GIL отпускается) идёт в фоне,
+        # пока основной поток фильтрует тот же батч и пишет второй файл.
+        with ThreadPoolExecutor(max_workers=1) as pool:
+            for batch in reader:
+                batch = normalize_batch(batch)
+                pending = pool.submit(w_norm.write_batch, batch)
+                kept = batch.filter(nonempty_metrics_mask(batch)).select(keep_cols)
+                w_filt.write_batch(kept)
+                pending.result()
+                before += batch.num_rows
+                after += kept.num_rows
+    return before, after
+
+
+def run_pandas(src: Path, p_norm: Path, p_filt: Path, chunksize: int, fmt: str = "csv") -> tuple[int, int]:
+    """Потоковый проход по чанкам: нормализованный чанк сразу фильтруется, без перечитывания p_norm."""
+    w_norm = w_filt = None
+    s_norm = s_filt = None
+    before = after = 0
+    try:
+        for chunk in pd.read_csv(src, chunksize=chunksize, dtype=PANDAS_DTYPES):
+            if "platform" in chunk.columns:
+                chunk["platform"] = normalize_platforms_series(chunk["platform"])
+            if "genres" in chunk.columns:
+                chunk["genres"] = normalize_genres_series(chunk["genres"])
+            df_filt, n_before, n_after = filter_dataframe(chunk)
+            # Следующие чанки приводим к схеме первого: выведенный тип лишнего столбца может плавать
+            t_norm = frame_to_table(chunk, s_norm)
+            t_filt = frame_to_table(df_filt, s_filt)
+            if w_norm is None:
+                s_norm, s_filt = t_norm.schema, t_filt.schema
+                w_norm = open_writer(p_norm, s_norm, fmt)
+                w_filt = open_writer(p_filt, s_filt, fmt)
+            w_norm.write_table(t_norm)
+            w_filt.write_table(t_filt)
+            before += n_before
+            after += n_after
+    finally:
+        for w in (w_norm, w_filt):
+            if w is not None:
+                w.close()
+    return before, after
+
+
+def run_polars(src: Path, p_norm: Path, p_filt: Path, fmt: str = "csv") -> tuple[int, int]:
+    """Тот же пайплайн на polars: один ленивый план, многопоточное исполнение."""
+    import polars as pl
+
+    polars_types = {pa.int64(): pl.Int64, pa.float64(): pl.Float64, pa.string(): pl.String}
+    lf = pl.scan_csv(src, schema_overrides={c: polars_types[t] for c, t in ARROW_COLUMN_TYPES.items()})
+    names = lf.collect_schema().names()
+    missing = [c for c in METRICS_COLS if c not in names]
+    if missing:
+        raise ValueError(f"Отсутствуют столбцы: {missing}")
+
+    def normalize_list_expr(col: str, mapping: dict) -> pl.Expr:
+        item = pl.element().str.strip_chars()
+        return (
+            pl.col(col).str.split(",")
+            .list.eval(item.filter(item != "").replace(mapping))
+            .list.unique().list.sort().list.join(", ")
+            .fill_null("")
+        )
+
+    # Пустую строку в кавычках polars читает как "", а pyarrow — как null; приводим к null, как у остальных движков
+    lf = lf.with_columns([pl.when(pl.col(c) != "").then(pl.col(c)).alias(c) for c in TEXT_COLS if c in names])
+    lf = lf.with_columns([
+        normalize_list_expr(col, mapping)
+        for col, mapping in (("platform", PLATFORM_MAP), ("genres", GENRE_MAP))
+        if col in names
+    ])
+    df_norm = lf.collect()
+    df_filt = df_norm.filter(pl.any_horizontal([pl.col(c).is_not_null() for c in METRICS_COLS]))
+    df_filt = df_filt.drop([c for c in SERVICE_COLS if c in names])
+
+    # Пишем через те же писатели, что и остальные движки: одинаковые пустые поля и числа в любом формате
+    for df, path in ((df_norm, p_norm), (df_filt, p_filt)):
+        table = df.to_arrow()
+        table = table.cast(pa.schema([(f.name, ARROW_COLUMN_TYPES.get(f.name, f.type)) for f in table.schema]))
+        with open_writer(path, table.schema, fmt) as w:
+            w.write_table(table)
+    return df_norm.height, df_filt.height
 
 
 def main() -> None:
     p = argparse.ArgumentParser(description="Нормализация и фильтрация HLTB датасета.")
     p.add_argument("--src", default="hltb_dataset.csv", help="Путь к исходному CSV.")
     p.add_argument("--out-dir", default=".", help="Папка для результатов.")
-    p.add_argument("--chunksize", type=int, default=50000, help="Размер чанка для потоковой обработки.")
+    p.add_argument("--chunksize", type=int, default=50000, help="Размер чанка для потоковой обработки (engine=pandas).")
+    p.add_argument("--engine", choices=["pyarrow", "pandas", "polars"], default="pyarrow",
+                   help="Движок чтения/записи CSV; pandas — запасной вариант, polars — опционально.")
+    p.add_argument("--format", choices=list(OUTPUT_SUFFIXES), default="csv",
+                   help="Формат результатов; parquet/feather пишутся со сжатием zstd.")
     args = p.parse_args()
+    if args.engine == "polars" and importlib.util.find_spec("polars") is None:
+        p.error("--engine polars требует установленного пакета polars")
 
     src = Path(args.src)
     out_dir = Path(args.out_dir)
     out_dir.mkdir(parents=True, exist_ok=True)
 
-    p_norm = out_dir / "hltb_dataset_normalized.csv"
-    p_filt = out_dir / "hltb_dataset_filtered.csv"
-
-    # Шаг 1: потоковая нормализация
-    wrote_header = False
-    total_rows = 0
-    for chunk in pd.read_csv(src, low_memory=False, chunksize=args.chunksize):
-        if "platform" in chunk.columns:
-            chunk["platform"] = normalize_platforms_series(chunk["platform"])
-        if "genres" in chunk.columns:
-            chunk["genres"] = normalize_genres_series(chunk["genres"])
-        coerce_dtypes_inplace(chunk)
-        chunk.to_csv(
-            p_norm,
-            index=False,
-            quoting=csv.QUOTE_ALL,
-            lineterminator="\n",
-            encoding="utf-8",
-            na_rep="",
-            mode="a",
-            header=not wrote_header
-        )
-        wrote_header = True
-        total_rows += len(chunk)
+    suffix = OUTPUT_SUFFIXES[args.format]
+    p_norm = out_dir / f"hltb_dataset_normalized{suffix}"
+    p_filt = out_dir / f"hltb_dataset_filtered{suffix}"
 
-    print(f"[OK] Нормализовано {total_rows} строк → {p_norm.name}")
+    if args.engine == "pyarrow":
+        before, after = run_pyarrow(src, p_norm, p_filt, args.format)
+    elif args.engine == "polars":
+        before, after = run_polars(src, p_norm, p_filt, args.format)
+    else:
+        before, after = run_pandas(src, p_norm, p_filt, args.chunksize, args.format)
 
-    # Шаг 2: фильтрация нормализованного файла
-    df_norm = pd.read_csv(p_norm, low_memory=False)
-    coerce_dtypes_inplace(df_norm)
-    df_filt, before, after, dropped_cols = filter_dataframe(df_norm)
-    write_csv(df_filt, p_filt)
+    print(f"[OK] Нормализовано {before} строк → {p_norm.name}")
     print(f"[OK] Фильтрация: удалено {before - after} строк. Осталось {after}.")
     print(f"[OK] Результат → {p_filt.name}")
 
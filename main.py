@@ -6,20 +6,53 @@ import asyncio
 import contextlib
 import csv
 import datetime as dt
+import importlib.util
+import itertools
 import json
+import multiprocessing
 import os
 import random
 import re
 import sys
+import time
 import traceback
-from typing import Any, Dict, Optional, Tuple, List
+from collections import namedtuple
+from concurrent.futures import Executor, ProcessPoolExecutor
+from html import unescape
+from typing import Any, Dict, Iterator, Optional, Tuple, List
 
 import aiohttp
 from aiohttp import ClientSession
-from bs4 import BeautifulSoup, NavigableString
+import lxml.html
+from lxml import etree
+
+try:  # httpx[http2] нужен только для --http2
+    import httpx
+except ImportError:
+    httpx = None
+
+try:  # uvloop (libuv) быстрее стандартного event loop; есть только на POSIX
+    import uvloop
+except ImportError:
+    uvloop = None
+
+try:  # orjson на C быстрее stdlib json; необязательная зависимость
+    import orjson
+    json_loads = orjson.loads
+except ImportError:
+    json_loads = json.loads
 
 DEFAULT_CSV_PATH = "hltb_dataset.csv"
 DEFAULT_LOG_PATH = "hltb.log"
+GAME_URL_PREFIX = "https://howlongtobeat.com/game/"
+WRITE_BATCH_SIZE = 50  # сколько строк копим перед writerows
+CSV_BUFFER_SIZE = 1 << 20
+DEFAULT_RATE = 10.0  # запросов в секунду на весь краулер
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+KEEPALIVE_TIMEOUT = 60.0  # держим простаивающие соединения дольше пауз backoff/Retry-After, сек
+READ_BUFSIZE = 1 << 17  # буфер чтения ответа aiohttp: меньше системных вызовов на страницу
+RETRY_AFTER_MAX = 120.0  # не ждём по Retry-After дольше этого, сек
+DUPLICATE = object()  # маркер в очереди: ID уже есть в CSV, страницу не качали
 
 CSV_HEADERS = [
     "id", "name", "type",
@@ -35,6 +68,9 @@ CSV_HEADERS = [
     "source_url", "crawled_at"
 ]
 
+# Строка CSV: плоский кортеж в порядке CSV_HEADERS вместо словаря на 28 ключей
+GameRow = namedtuple("GameRow", CSV_HEADERS)
+
 USER_AGENT = (
     "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) "
     "AppleWebKit/537.36 (KHTML, like Gecko) "
@@ -52,37 +88,103 @@ TIME_KEYS = [
     "single_player", "co_op", "versus"
 ]
 POLLED_KEYS = [f"{k}_polled" for k in TIME_KEYS]
+ALL_TIME_KEYS = tuple(TIME_KEYS + POLLED_KEYS)  # собираем один раз, а не конкатенацией на каждой странице
+POLLED_KEY_OF = dict(zip(TIME_KEYS, POLLED_KEYS))  # "co_op" -> "co_op_polled" без f-строки на каждой строке таблицы
+
+# Словари-справочники парсеров — на уровне модуля, чтобы не собирать их заново на каждой ячейке
+TIME_LABELS = {
+    "main story": "main_story",
+    "main + sides": "main_plus_sides",
+    "main + extras": "main_plus_sides",
+    "completionist": "completionist",
+    "all styles": "all_styles",
+    "all playstyles": "all_styles",
+    "single-player": "single_player",
+    "single player": "single_player",
+    "singleplayer": "single_player",
+    "co-op": "co_op",
+    "coop": "co_op",
+    "competitive": "versus",
+    "vs.": "versus",
+    "versus": "versus",
+}
+
+# Нормализуем лейблы: оставляем только латинские буквы, без пробелов и двоеточий.
+META_LABELS = {
+    "platform": "platform",
+    "platforms": "platform",
+    "genre": "genres",
+    "genres": "genres",
+    "developer": "developer",
+    "publisher": "publisher",
+}
+
+# маппинг к единому словарю жанров по вкусу; пример — выравнивание кейсов и синонимов
+GENRE_SYNONYMS = {
+    "role-playing": "Role-Playing",
+    "rpg": "Role-Playing",
+    "shoot em' up": "Shoot 'Em Up",
+    "vertical scrolling shooter": "Vertical Scrolling Shooter",
+    "racing/driving": "Racing, Driving",
+}
+
+# Единицы, которые parse_hours разбирает без regex (строка уже в нижнем регистре)
+FAST_HOUR_UNITS = {"h", "hour", "hours"}
+FAST_MINUTE_UNITS = {"m", "min", "mins", "minute", "minutes"}
+
+# Регулярки компилируем один раз: они крутятся на каждой ячейке каждой страницы
+RE_RANGE_SEP = re.compile(r"\s*[-–—]\s*")
+# Ветки идут в том же порядке, в каком раньше шли отдельные re.match
+RE_DURATION = re.compile(
+    r"^(?:"
+    r"(?P<half>\d+)\s*½\s*h(?:our)?s?\b"
+    r"|(?P<only_half>½)\s*h(?:our)?s?\b"
+    r"|(?P<hm_h>\d+)\s*h\s*(?P<hm_m>\d+)\s*m\b"
+    r"|(?P<hours>\d+)\s*h(?:our)?s?\b"
+    r"|(?P<minutes>\d+)\s*(?:m|mins?|minutes?)\b"
+    r")",
+    re.I,
+)
+RE_INT = re.compile(r"\d[\d,]*")
+RE_NON_LETTERS = re.compile(r"[^a-z]+")
+RE_SPACES = re.compile(r"\s+")
+RE_PLATFORM_SEP = re.compile(r"[,\n]+")
+# Первый div заголовка; группа 2 есть, только если внутри один текстовый узел без вложенных тегов
+RE_HEADER_NAME = re.compile(r'<div\b[^>]*\bclass="[^"]*GameHeader_profile_header__[^"]*"[^>]*>([^<]*)(</div>)?')
+# Месяц зашит в паттерн: слова-не-месяцы отсекает сам движок, MONTHS нужен только для номера
+MONTH_ALT = "|".join(MONTHS)
+RE_DATE_DAY = re.compile(rf"[A-Z]{{2,3}}:\s*({MONTH_ALT})\s+(\d{{1,2}})(?:st|nd|rd|th)?,?\s+(\d{{4}})", re.I)
+RE_DATE_MONTH = re.compile(rf"[A-Z]{{2,3}}:\s*({MONTH_ALT})\s+(\d{{4}})\b", re.I)
+RE_DATE_YEAR = re.compile(r"[A-Z]{2,3}:\s*(\d{4})\b")
 
 
 # ----------------------------- Логирование в консоль и файл -----------------------------
 
+# Лог-файл сбрасываем на диск не чаще раза в LOG_FLUSH_INTERVAL, а не на каждой строке
+LOG_FLUSH_INTERVAL = 1.0
+LOG_FLUSH = {"t": 0.0}
+
+
 def log(msg: str, file) -> None:
     print(msg)
     file.write(msg + "\n")
-    file.flush()
+    now = time.monotonic()
+    if now - LOG_FLUSH["t"] >= LOG_FLUSH_INTERVAL:
+        file.flush()
+        LOG_FLUSH["t"] = now
+
+
+async def flush_log_periodically(file) -> None:
+    """Сбрасывает лог раз в LOG_FLUSH_INTERVAL, даже когда новых строк нет (Retry-After, тишина)."""
+    while True:
+        await asyncio.sleep(LOG_FLUSH_INTERVAL)
+        file.flush()
 
 
 # ----------------------------- Утилиты нормализации -----------------------------
 
 def norm_time_label(label: str) -> Optional[str]:
-    lbl = label.strip().lower()
-    mapping = {
-        "main story": "main_story",
-        "main + sides": "main_plus_sides",
-        "main + extras": "main_plus_sides",
-        "completionist": "completionist",
-        "all styles": "all_styles",
-        "all playstyles": "all_styles",
-        "single-player": "single_player",
-        "single player": "single_player",
-        "singleplayer": "single_player",
-        "co-op": "co_op",
-        "coop": "co_op",
-        "competitive": "versus",
-        "vs.": "versus",
-        "versus": "versus",
-    }
-    return mapping.get(lbl)
+    return TIME_LABELS.get(label.strip().lower())
 
 
 def parse_hours(text: str) -> Optional[float]:
@@ -93,52 +195,43 @@ def parse_hours(text: str) -> Optional[float]:
         return None
 
     if "-" in raw or "–" in raw or "—" in raw:
-        parts = re.split(r"\s*[-–—]\s*", raw)
+        parts = RE_RANGE_SEP.split(raw)
         if len(parts) == 2:
             a = parse_hours(parts[0]); b = parse_hours(parts[1])
             if a is not None and b is not None:
                 avg = round((a + b) / 2.0, 2)
                 return int(avg) if float(avg).is_integer() else avg
 
-    m = re.match(r"^(\d+)\s*½\s*h(?:our)?s?\b", raw, flags=re.I)
-    if m:
-        val = float(m.group(1)) + 0.5
-        return int(val) if float(val).is_integer() else val
+    # Быстрый путь для самого частого вида ячейки — "12 Hours" / "45 Mins": без regex
+    head, _, unit = raw.partition(" ")
+    if head.isdecimal():
+        if unit in FAST_HOUR_UNITS:
+            return int(head)
+        if unit in FAST_MINUTE_UNITS:
+            val = round(int(head) / 60.0, 2)
+            return int(val) if float(val).is_integer() else val
 
-    if re.match(r"^½\s*h(?:our)?s?\b", raw, flags=re.I):
+    m = RE_DURATION.match(raw)
+    if not m:
+        return None
+    kind = m.lastgroup
+    if kind == "half":
+        val = float(m.group("half")) + 0.5
+    elif kind == "only_half":
         return 0.5
-
-    m = re.match(r"^(\d+)\s*h\s*(\d+)\s*m\b", raw, flags=re.I)
-    if m:
-        hours = int(m.group(1)); minutes = int(m.group(2))
-        val = round(hours + minutes / 60.0, 2)
-        return int(val) if float(val).is_integer() else val
-
-    m = re.match(r"^(\d+)\s*h\b", raw, flags=re.I)
-    if m:
-        return int(m.group(1))
-
-    m = re.match(r"^(\d+)\s*m\b", raw, flags=re.I)
-    if m:
-        val = round(int(m.group(1)) / 60.0, 2)
-        return int(val) if float(val).is_integer() else val
-
-    m = re.match(r"^(\d+)\s*(mins?|minutes?)\b", raw, flags=re.I)
-    if m:
-        val = round(int(m.group(1)) / 60.0, 2)
-        return int(val) if float(val).is_integer() else val
-
-    m = re.match(r"^(\d+)\s*h(?:our)?s?\b", raw, flags=re.I)
-    if m:
-        return int(m.group(1))
-
-    return None
+    elif kind == "hm_m":
+        val = round(int(m.group("hm_h")) + int(m.group("hm_m")) / 60.0, 2)
+    elif kind == "hours":
+        return int(m.group("hours"))
+    else:
+        val = round(int(m.group("minutes")) / 60.0, 2)
+    return int(val) if float(val).is_integer() else val
 
 
 def to_int(text: str) -> Optional[int]:
     if not text:
         return None
-    m = re.search(r"\d[\d,]*", text)
+    m = RE_INT.search(text)
     if not m:
         return None
     try:
@@ -148,31 +241,98 @@ def to_int(text: str) -> Optional[int]:
 
 
 def ensure_time_keys(d: Dict[str, Any]) -> Dict[str, Any]:
-    for k in TIME_KEYS + POLLED_KEYS:
+    for k in ALL_TIME_KEYS:
         d.setdefault(k, None)
     return d
 
 
 # ----------------------------- Парсинг HTML -----------------------------
 
+# Текст внутри этих тегов не считается текстом страницы (как в get_text у bs4)
+SKIP_TEXT_TAGS = {"script", "style", "template"}
+
+
+def iter_text(el) -> List[str]:
+    """Все текстовые узлы поддерева в порядке документа, без комментариев и скриптов."""
+    out: List[str] = []
+    if el.tag not in SKIP_TEXT_TAGS and el.text:
+        out.append(el.text)
+    for child in el:
+        if isinstance(child.tag, str):
+            out.extend(iter_text(child))
+        if child.tail:
+            out.append(child.tail)
+    return out
+
+
+def stripped_strings(el) -> List[str]:
+    return [t for t in (s.strip() for s in iter_text(el)) if t]
+
+
+def text_of(el, sep: str = " ") -> str:
+    # Частый случай — ячейка с одним текстовым узлом без вложенных тегов: поддерево не обходим
+    if not len(el) and el.tag not in SKIP_TEXT_TAGS:
+        return el.text.strip() if el.text else ""
+    return sep.join(stripped_strings(el))
+
+
+def class_xpath(tag: str, prefix: str) -> etree.XPath:
+    return etree.XPath(f'.//{tag}[contains(@class, "{prefix}")]')
+
+
+# XPath компилируем один раз на модуль, а не на каждый вызов
+XP_LD_JSON = etree.XPath('.//script[@type="application/ld+json"]')
+XP_SPREADSHEET_ROWS = class_xpath("tr", "spreadsheet")
+
+# Блоки страницы, нужные парсерам: (тег, подстрока класса)
+HEADER_BLOCK = ("div", "GameHeader_profile_header__")
+INFO_BLOCK = ("div", "GameSummary_profile_info__")
+STATS_BLOCK = ("div", "GameStats_game_times__")
+TIME_TABLE_BLOCK = ("table", "GameTimeTable_game_main_table__")
+PAGE_BLOCKS = (HEADER_BLOCK, INFO_BLOCK, STATS_BLOCK, TIME_TABLE_BLOCK)
+
+
+def index_blocks(tree) -> Dict[Tuple[str, str], List[Any]]:
+    """Один обход div/table дерева вместо отдельного XPath-поиска на каждый блок; порядок — документный."""
+    out: Dict[Tuple[str, str], List[Any]] = {b: [] for b in PAGE_BLOCKS}
+    for el in tree.iter("div", "table"):
+        cls = el.get("class")
+        # у всех нужных классов есть "Game" — остальные элементы отсекаем одной проверкой
+        if not cls or "Game" not in cls:
+            continue
+        for block in PAGE_BLOCKS:
+            if el.tag == block[0] and block[1] in cls:
+                out[block].append(el)
+    return out
+
+
 def extract_id_from_url(url: str) -> int:
-    m = re.search(r"/game/(\d+)$", url)
-    if not m:
+    # URL всегда вида https://howlongtobeat.com/game/<id>
+    tail = url.rsplit("/", 1)[-1]
+    if not tail.isdigit():
         raise ValueError("Не удалось извлечь ID игры из URL.")
-    return int(m.group(1))
+    return int(tail)
 
 
-def parse_name_from_page(soup: BeautifulSoup) -> Optional[str]:
-    div = soup.find("div", class_=re.compile(r"GameHeader_profile_header__.*"))
-    if div:
-        text = div.get_text(strip=True)
+def parse_name_fast(html: str) -> Optional[str]:
+    """Имя игры прямо из сырого HTML, без построения дерева; None — пусть решает полный разбор."""
+    m = RE_HEADER_NAME.search(html)
+    if not m or m.group(2) is None:
+        return None
+    return unescape(m.group(1)).strip() or None
+
+
+def parse_name_from_page(tree, divs: List[Any]) -> Optional[str]:
+    if divs:
+        text = text_of(divs[0], "")
         if text:
             return text
-    for tag in soup.find_all("script", attrs={"type": "application/ld+json"}):
-        if not tag.string:
+    for tag in XP_LD_JSON(tree):
+        # Блоб без ключа "name" имени не даст — не декодируем его вовсе
+        if not tag.text or '"name"' not in tag.text:
             continue
         try:
-            data = json.loads(tag.string)
+            data = json_loads(tag.text)
         except Exception:
             continue
         items = data if isinstance(data, list) else [data]
@@ -182,35 +342,33 @@ def parse_name_from_page(soup: BeautifulSoup) -> Optional[str]:
     return None
 
 
-def parse_times_from_tables(soup: BeautifulSoup) -> Dict[str, Optional[float]]:
-    result: Dict[str, Optional[float]] = {k: None for k in TIME_KEYS + POLLED_KEYS}
-    tables = soup.find_all("table", class_=re.compile(r"GameTimeTable_game_main_table__"))
+def parse_times_from_tables(tables: List[Any]) -> Dict[str, Optional[float]]:
+    result: Dict[str, Optional[float]] = dict.fromkeys(ALL_TIME_KEYS)
     if not tables:
         return result
 
     for table in tables:
-        thead = table.find("thead")
+        thead = table.find(".//thead")
         section = None
-        if thead:
-            first_td = thead.find("td")
-            if first_td:
-                section = first_td.get_text(" ", strip=True).strip().lower()
+        if thead is not None:
+            first_td = thead.find(".//td")
+            if first_td is not None:
+                section = text_of(first_td).strip().lower()
 
-        tbody = table.find("tbody")
-        if not tbody:
+        tbody = table.find(".//tbody")
+        if tbody is None:
             continue
 
-        for tr in tbody.find_all("tr", class_=re.compile(r"spreadsheet")):
-            tds = tr.find_all("td")
+        for tr in XP_SPREADSHEET_ROWS(tbody):
+            tds = tr.findall(".//td")
             if len(tds) < 3:
                 continue
-            label = tds[0].get_text(" ", strip=True)
-            polled_text = tds[1].get_text(" ", strip=True)
-            avg_text = tds[2].get_text(" ", strip=True)
-
-            key = norm_time_label(label)
+            # Строки с чужими лейблами (платформы, спидраны) отсекаем до разбора остальных ячеек
+            key = norm_time_label(text_of(tds[0]))
             if key is None:
                 continue
+            polled_text = text_of(tds[1])
+            avg_text = text_of(tds[2])
 
             avg_val = None if not avg_text or avg_text.strip().lower() in {"--", "-"} else parse_hours(avg_text)
             polled_val = to_int(polled_text)
@@ -224,24 +382,23 @@ def parse_times_from_tables(soup: BeautifulSoup) -> Dict[str, Optional[float]]:
             if avg_val is not None:
                 result[key] = avg_val
             if polled_val is not None:
-                result[f"{key}_polled"] = polled_val
+                result[POLLED_KEY_OF[key]] = polled_val
 
     return result
 
 
-def parse_times_from_page(soup: BeautifulSoup) -> Dict[str, Optional[float]]:
-    result: Dict[str, Optional[float]] = {k: None for k in TIME_KEYS}
-    stats = soup.find("div", class_=re.compile(r"GameStats_game_times__.*"))
+def parse_times_from_page(stats: List[Any]) -> Dict[str, Optional[float]]:
+    result: Dict[str, Optional[float]] = dict.fromkeys(TIME_KEYS)
     if not stats:
         return result
 
     extra: Dict[str, Optional[float]] = {}
-    for li in stats.find_all("li"):
-        h4 = li.find("h4"); h5 = li.find("h5")
-        if not h4 or not h5:
+    for li in stats[0].iterfind(".//li"):
+        h4 = li.find(".//h4"); h5 = li.find(".//h5")
+        if h4 is None or h5 is None:
             continue
-        label = h4.get_text(" ", strip=True)
-        value_text = h5.get_text(" ", strip=True)
+        label = text_of(h4)
+        value_text = text_of(h5)
         key = norm_time_label(label)
         if not key:
             continue
@@ -258,10 +415,10 @@ def parse_times_from_page(soup: BeautifulSoup) -> Dict[str, Optional[float]]:
     return ensure_time_keys(result)
 
 
-def detect_content_type(soup: BeautifulSoup) -> str:
+def detect_content_type(info_texts: List[str]) -> str:
     flags: List[str] = []
-    for div in soup.find_all("div", class_=re.compile(r"GameSummary_profile_info__.*")):
-        text = " ".join(div.stripped_strings).lower()
+    for text in info_texts:
+        text = text.lower()
         if "note:" in text:
             if "dlc/expansion" in text:
                 flags.append("dlc/expansion")
@@ -270,7 +427,7 @@ def detect_content_type(soup: BeautifulSoup) -> str:
     return "game" if not flags else "; ".join(sorted(set(flags)))
 
 
-def parse_meta_fields(soup: BeautifulSoup) -> Dict[str, Optional[str]]:
+def parse_meta_fields(info_divs: List[Any]) -> Dict[str, Optional[str]]:
     out = {
         "platform": None,
         "genres": None,
@@ -278,50 +435,43 @@ def parse_meta_fields(soup: BeautifulSoup) -> Dict[str, Optional[str]]:
         "publisher": None,
     }
 
-    info_divs = soup.find_all("div", class_=re.compile(r"GameSummary_profile_info__"))
     if not info_divs:
         return out
 
-    # Нормализуем лейблы: оставляем только латинские буквы, без пробелов и двоеточий.
-    key_map = {
-        "platform": "platform",
-        "platforms": "platform",
-        "genre": "genres",
-        "genres": "genres",
-        "developer": "developer",
-        "publisher": "publisher",
-    }
-
     for div in info_divs:
-        strong = div.find("strong")
-        if not strong:
+        strong = div.find(".//strong")
+        if strong is None:
             continue
 
-        raw_label = strong.get_text(" ", strip=True)
-        norm_label = re.sub(r"[^a-z]+", "", raw_label.lower())  # "Genres:" -> "genres", "Genre s" -> "genres"
-        key = key_map.get(norm_label)
+        raw_label = text_of(strong)
+        norm_label = RE_NON_LETTERS.sub("", raw_label.lower())  # "Genres:" -> "genres", "Genre s" -> "genres"
+        key = META_LABELS.get(norm_label)
         if not key:
             continue
 
         # Собираем ТОЛЬКО содержимое после <strong>…</strong>, игнорируя <br> и двоеточие.
+        # В lxml текст между тегами живёт в .tail предыдущего элемента.
+        nodes: List[Any] = [strong.tail]
+        for sib in strong.itersiblings():
+            nodes.append(sib)
+            nodes.append(sib.tail)
+
         chunks: List[str] = []
-        for sib in strong.next_siblings:
-            if isinstance(sib, NavigableString):
-                txt = str(sib).strip()
-                if not txt:
-                    continue
+        for node in nodes:
+            if node is None:
+                continue
+            if isinstance(node, str):
+                txt = node.strip()
                 if txt.startswith(":"):
                     txt = txt.lstrip(":").strip()
-                if txt:
-                    chunks.append(txt)
             else:
-                if getattr(sib, "name", None) == "br":
+                if not isinstance(node.tag, str) or node.tag == "br":
                     continue
-                txt = sib.get_text(" ", strip=True)
-                if txt:
-                    chunks.append(txt)
+                txt = text_of(node)
+            if txt:
+                chunks.append(txt)
 
-        value = re.sub(r"\s+", " ", " ".join(chunks)).strip()
+        value = RE_SPACES.sub(" ", " ".join(chunks)).strip()
         if value in {"", "-", "--"}:
             value = None
 
@@ -332,83 +482,70 @@ def parse_meta_fields(soup: BeautifulSoup) -> Dict[str, Optional[str]]:
 
 def normalize_meta(meta: Dict[str, Optional[str]]) -> Dict[str, Optional[str]]:
     if meta.get("platform"):
-        parts = re.split(r"[,\n]+", meta["platform"])
+        parts = RE_PLATFORM_SEP.split(meta["platform"])
         parts = [p.strip() for p in parts if p.strip()]
         parts = list(dict.fromkeys(parts))  # дедуп
         meta["platform"] = ", ".join(parts)
 
     if meta.get("genres"):
-        # маппинг к единому словарю жанров по вкусу; пример — выравнивание кейсов и синонимов
-        synonyms = {
-            "role-playing": "Role-Playing",
-            "rpg": "Role-Playing",
-            "shoot em' up": "Shoot 'Em Up",
-            "vertical scrolling shooter": "Vertical Scrolling Shooter",
-            "racing/driving": "Racing, Driving",
-        }
         parts = [g.strip() for g in meta["genres"].split(",") if g.strip()]
         normed = []
         for g in parts:
             key = g.lower()
-            g2 = synonyms.get(key, g.title())
+            g2 = GENRE_SYNONYMS.get(key, g.title())
             normed.append(g2)
         normed = list(dict.fromkeys(normed))
         meta["genres"] = ", ".join(normed)
 
     for k in ("developer", "publisher"):
         if meta.get(k):
-            meta[k] = re.sub(r"\s+", " ", meta[k]).strip() or None
+            meta[k] = RE_SPACES.sub(" ", meta[k]).strip() or None
 
     return meta
 
 
-def parse_release_info(soup: BeautifulSoup) -> Dict[str, Optional[str]]:
-    texts = []
-    for div in soup.find_all("div", class_=re.compile(r"GameSummary_profile_info__.*")):
-        txt = " ".join(div.stripped_strings)
-        if txt:
-            texts.append(txt)
-
-    for text in texts:
-        m = re.search(r"[A-Z]{2,3}:\s*([A-Za-z]+)\s+(\d{1,2})(?:st|nd|rd|th)?,?\s+(\d{4})", text, re.I)
+def parse_release_info(info_texts: List[str]) -> Dict[str, Optional[str]]:
+    # Один проход: дата с днём возвращается сразу, месяц и год запоминаем по первому совпадению.
+    # Приоритет прежний — день в любом блоке важнее месяца, месяц важнее года.
+    month_match = year_match = None
+    for text in info_texts:
+        if not text:
+            continue
+        m = RE_DATE_DAY.search(text)
         if m:
-            month_name = m.group(1).lower()
+            month = MONTHS[m.group(1).lower()]
             day = int(m.group(2)); year = int(m.group(3))
-            month = MONTHS.get(month_name)
-            if month:
-                return {
-                    "release_date": f"{year:04d}-{month:02d}-{day:02d}",
-                    "release_precision": "day",
-                    "release_year": f"{year:04d}",
-                    "release_month": f"{month:02d}",
-                    "release_day": f"{day:02d}",
-                }
-
-    for text in texts:
-        m = re.search(r"[A-Z]{2,3}:\s*([A-Za-z]+)\s+(\d{4})\b", text, re.I)
-        if m:
-            month_name = m.group(1).lower(); year = int(m.group(2))
-            month = MONTHS.get(month_name)
-            if month:
-                return {
-                    "release_date": f"{year:04d}-{month:02d}",
-                    "release_precision": "month",
-                    "release_year": f"{year:04d}",
-                    "release_month": f"{month:02d}",
-                    "release_day": None,
-                }
-
-    for text in texts:
-        m = re.search(r"[A-Z]{2,3}:\s*(\d{4})\b", text)
-        if m:
-            year = int(m.group(1))
             return {
-                "release_date": f"{year:04d}",
-                "release_precision": "year",
+                "release_date": f"{year:04d}-{month:02d}-{day:02d}",
+                "release_precision": "day",
                 "release_year": f"{year:04d}",
-                "release_month": None,
-                "release_day": None,
+                "release_month": f"{month:02d}",
+                "release_day": f"{day:02d}",
             }
+        if month_match is None:
+            month_match = RE_DATE_MONTH.search(text)
+        if year_match is None:
+            year_match = RE_DATE_YEAR.search(text)
+
+    if month_match:
+        month = MONTHS[month_match.group(1).lower()]; year = int(month_match.group(2))
+        return {
+            "release_date": f"{year:04d}-{month:02d}",
+            "release_precision": "month",
+            "release_year": f"{year:04d}",
+            "release_month": f"{month:02d}",
+            "release_day": None,
+        }
+
+    if year_match:
+        year = int(year_match.group(1))
+        return {
+            "release_date": f"{year:04d}",
+            "release_precision": "year",
+            "release_year": f"{year:04d}",
+            "release_month": None,
+            "release_day": None,
+        }
 
     return {
         "release_date": None,
@@ -419,15 +556,12 @@ def parse_release_info(soup: BeautifulSoup) -> Dict[str, Optional[str]]:
     }
 
 
-def parse_release_date_legacy(soup: BeautifulSoup) -> Optional[str]:
-    for div in soup.find_all("div", class_=re.compile(r"GameSummary_profile_info__.*")):
-        text = " ".join(div.stripped_strings)
-        m = re.search(r"([A-Z]{2,3}):\s*([A-Za-z]+)\s+(\d{1,2})(?:st|nd|rd|th)?,?\s+(\d{4})", text, re.I)
+def parse_release_date_legacy(info_texts: List[str]) -> Optional[str]:
+    for text in info_texts:
+        m = RE_DATE_DAY.search(text)
         if m:
-            month_name = m.group(2).lower(); day = int(m.group(3)); year = int(m.group(4))
-            month = MONTHS.get(month_name)
-            if month:
-                return f"{year:04d}-{month:02d}-{day:02d}"
+            month = MONTHS[m.group(1).lower()]; day = int(m.group(2)); year = int(m.group(3))
+            return f"{year:04d}-{month:02d}-{day:02d}"
     return None
 
 
@@ -445,82 +579,159 @@ def merge_release_info(primary: Dict[str, Optional[str]], fallback_date: Optiona
     return out
 
 
-def parse_hltb_game_from_html(url: str, html: str) -> Optional[Dict[str, Any]]:
-    soup = BeautifulSoup(html, "html.parser")
+# crawled_at пишется с точностью до секунды — строку пересобираем раз в секунду
+NOW_CACHE = {"t": 0, "s": ""}
+
+
+def now_iso_cached() -> str:
+    now = int(time.time())
+    if now != NOW_CACHE["t"]:
+        NOW_CACHE["t"] = now
+        NOW_CACHE["s"] = dt.datetime.fromtimestamp(now, dt.UTC).isoformat().replace("+00:00", "Z")
+    return NOW_CACHE["s"]
 
-    name = parse_name_from_page(soup)
+
+def parse_hltb_game_from_html(url: str, html: str, game_id: Optional[int] = None) -> Optional[GameRow]:
+    # Soft-404: имя берётся только из заголовка или JSON-LD — без обоих маркеров дерево не строим
+    if "GameHeader_profile_header__" not in html and "application/ld+json" not in html:
+        return None
+
+    try:
+        tree = lxml.html.document_fromstring(html)
+    except etree.ParserError:  # пустой документ
+        return None
+
+    # Все нужные блоки страницы собираем за один обход дерева
+    blocks = index_blocks(tree)
+
+    name = parse_name_fast(html) or parse_name_from_page(tree, blocks[HEADER_BLOCK])
     if not name:
         return None
 
-    content_type = detect_content_type(soup)
-    meta = parse_meta_fields(soup)  # распарсили, что есть на странице
+    # Текст блоков GameSummary_profile_info__ нужен нескольким парсерам — собираем один раз
+    info_divs = blocks[INFO_BLOCK]
+    info_texts = [text_of(div) for div in info_divs]
+
+    content_type = detect_content_type(info_texts)
+    meta = parse_meta_fields(info_divs)  # распарсили, что есть на странице
     meta = normalize_meta(meta)  # привели к единому формату
 
-    times = parse_times_from_tables(soup)
+    times = parse_times_from_tables(blocks[TIME_TABLE_BLOCK])
     if all(times.get(k) is None for k in TIME_KEYS):
-        times = parse_times_from_page(soup)
+        times = parse_times_from_page(blocks[STATS_BLOCK])
     times = ensure_time_keys(times)
 
-    ri = parse_release_info(soup)
-    legacy = parse_release_date_legacy(soup)
+    ri = parse_release_info(info_texts)
+    legacy = parse_release_date_legacy(info_texts)
     ri = merge_release_info(ri, legacy)
 
-    game_id = extract_id_from_url(url)
-    now_iso = dt.datetime.now(dt.UTC).replace(microsecond=0).isoformat().replace("+00:00", "Z")
-
-    record: Dict[str, Any] = {
-        "id": str(game_id),
-        "name": name,
-        "type": content_type,
-        "platform": meta["platform"],
-        "genres": meta["genres"],
-        "developer": meta["developer"],
-        "publisher": meta["publisher"],
+    if game_id is None:
+        game_id = extract_id_from_url(url)
+    now_iso = now_iso_cached()
+
+    return GameRow(
+        id=str(game_id),
+        name=name,
+        type=content_type,
+        platform=meta["platform"],
+        genres=meta["genres"],
+        developer=meta["developer"],
+        publisher=meta["publisher"],
         **ri,
         **times,
-        "source_url": url,
-        "crawled_at": now_iso
-    }
-    return record
+        source_url=url,
+        crawled_at=now_iso
+    )
 
 
 # ----------------------------- Сетевой слой (async) -----------------------------
 
+class RateLimiter:
+    """Token bucket: в среднем не больше rate запросов в секунду, всплеск до burst."""
+
+    def __init__(self, rate: float, burst: Optional[int] = None):
+        self.rate = rate
+        self.capacity = float(burst or max(1, int(rate)))
+        self.tokens = self.capacity
+        self.last_refill = time.monotonic()
+        self.not_before = 0.0
+        self.lock = asyncio.Lock()
+
+    def hold(self, seconds: float) -> None:
+        """Приостанавливает выдачу токенов всем воркерам (например, по Retry-After)."""
+        self.not_before = max(self.not_before, time.monotonic() + seconds)
+
+    async def acquire(self) -> None:
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                if now < self.not_before:
+                    await asyncio.sleep(self.not_before - now)
+                    continue
+                self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+                self.last_refill = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    # HLTB/CDN отдают секунды; HTTP-дату не разбираем — тогда обычный backoff
+    if not value:
+        return None
+    try:
+        return min(max(0.0, float(value)), RETRY_AFTER_MAX)
+    except ValueError:
+        return None
+
+
 class Fetcher:
-    def __init__(self, session: ClientSession, log_file, concurrency: int, base_delay: float = 0.25, jitter: float = 0.35):
+    # Ошибки транспорта, после которых запрос повторяется
+    transport_errors: Tuple[type, ...] = (aiohttp.ClientError,)
+
+    def __init__(self, session: ClientSession, log_file, limiter: RateLimiter):
         self.session = session
-        self.semaphore = asyncio.Semaphore(concurrency)
-        self.base_delay = base_delay
-        self.jitter = jitter
+        self.limiter = limiter
         self.log = log_file
 
-    async def polite_sleep(self):
-        await asyncio.sleep(self.base_delay + random.random() * self.jitter)
+    async def _request(self, url: str) -> Tuple[int, Optional[str], Optional[str]]:
+        """Один GET: (статус, тело при 200, заголовок Retry-After)."""
+        async with self.session.get(url, timeout=aiohttp.ClientTimeout(total=30)) as resp:
+            if resp.status != 200:
+                return resp.status, None, resp.headers.get("Retry-After")
+            # HLTB всегда отдаёт UTF-8: декодируем сами, без определения кодировки
+            return resp.status, (await resp.read()).decode("utf-8", "replace"), None
 
     async def fetch_html(self, url: str, max_attempts: int = 5) -> Optional[str]:
-        attempt = 0
         backoff = 0.6
-        while attempt < max_attempts:
-            attempt += 1
-            async with self.semaphore:
-                try:
-                    async with self.session.get(url, timeout=aiohttp.ClientTimeout(total=30)) as resp:
-                        if resp.status == 404:
-                            return None
-                        if resp.status in {200}:
-                            text = await resp.text()
-                            if text:
-                                return text
-                        if resp.status in {429, 500, 502, 503, 504}:
-                            await self._warn(url, f"retryable status {resp.status}, attempt {attempt}")
-                        else:
-                            await self._warn(url, f"bad status {resp.status}, attempt {attempt}")
-                except asyncio.TimeoutError:
-                    await self._warn(url, f"timeout, attempt {attempt}")
-                except aiohttp.ClientError as e:
-                    await self._warn(url, f"client_error={repr(e)}, attempt {attempt}")
-
-            await asyncio.sleep(backoff + random.random() * 0.4)
+        for attempt in range(1, max_attempts + 1):
+            await self.limiter.acquire()
+            retry_after = None
+            try:
+                status, text, retry_after_header = await self._request(url)
+                if status == 404:
+                    return None
+                if status == 200 and text:
+                    return text
+                if status in RETRY_STATUSES:
+                    retry_after = parse_retry_after(retry_after_header)
+                    await self._warn(url, f"retryable status {status}, attempt {attempt}")
+                else:
+                    await self._warn(url, f"bad status {status}, attempt {attempt}")
+            except asyncio.TimeoutError:
+                await self._warn(url, f"timeout, attempt {attempt}")
+            except self.transport_errors as e:
+                await self._warn(url, f"client_error={repr(e)}, attempt {attempt}")
+
+            if attempt == max_attempts:
+                break
+            delay = backoff + random.random() * 0.4
+            if retry_after is not None:
+                # сервер просит подождать — притормаживаем всех, а не только этот воркер
+                self.limiter.hold(retry_after)
+                delay = max(delay, retry_after)
+            await asyncio.sleep(delay)
             backoff *= 1.7
 
         return None
@@ -529,282 +740,272 @@ class Fetcher:
         log(f"[WARN] {url} — {msg}", self.log)
 
 
-# ----------------------------- Пайплайн: producer/consumer -----------------------------
-
-async def producer(fetcher: "Fetcher",
-                   start_id: int,
-                   out_q: "asyncio.Queue[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]",
-                   stop_event: asyncio.Event,
-                   end_id: Optional[int] = None):
-    i = start_id
-    while not stop_event.is_set():
-        if end_id is not None and i >= end_id:
-            break
-        url = f"https://howlongtobeat.com/game/{i}"
-        html = await fetcher.fetch_html(url)
-        if html is None:
-            await out_q.put((i, None, None))
-            await fetcher.polite_sleep()
-            i += 1
-            continue
-        try:
-            data = parse_hltb_game_from_html(url, html)
-        except Exception as e:
-            err = f"{repr(e)}\n{traceback.format_exc()}"
-            await out_q.put((i, None, err))
-            await fetcher.polite_sleep()
-            i += 1
-            continue
-
-        await out_q.put((i, data, None))
-        await fetcher.polite_sleep()
-        i += 1
-
-
-async def consumer(out_q: "asyncio.Queue[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]",
-                   writer: csv.DictWriter,
-                   log_file,
-                   existing_ids: set,
-                   stop_event: asyncio.Event,
-                   miss_threshold: int):
-    processed = 0
-    consecutive_skips = 0
-    while True:
-        item = await out_q.get()
-        if item is None:
-            out_q.task_done()
-            break
-
-        game_id, data, err = item
-
-        if err:
-            log(f"[ERROR] ID {game_id} — {err}", log_file)
-            out_q.task_done()
-            continue
-
-        if data is None:
-            consecutive_skips += 1
-            log(f"[SKIP]  ID {game_id} — нет данных или 404 (streak={consecutive_skips}/{miss_threshold})", log_file)
-            if consecutive_skips >= miss_threshold and not stop_event.is_set():
-                log(f"[STOP]  Достигнут порог подряд: {miss_threshold} пропусков. Останов.", log_file)
-                stop_event.set()
-            out_q.task_done()
-            continue
-
-        consecutive_skips = 0
-
-        if data["id"] in existing_ids:
-            log(f"[DUP]   ID {game_id} — пропущен (уже есть в CSV)", log_file)
-            out_q.task_done()
-            continue
+class HttpxFetcher(Fetcher):
+    """Тот же Fetcher поверх httpx.AsyncClient: HTTP/2 мультиплексирует запросы в одном соединении."""
 
-        writer.writerow(data)
-        existing_ids.add(data["id"])
-        log(f"[OK]    ID {game_id} — {data.get('name')}", log_file)
+    def __init__(self, session, log_file, limiter: RateLimiter):
+        super().__init__(session, log_file, limiter)
+        self.transport_errors = (httpx.HTTPError,)
 
-        processed += 1
-        if processed % 100 == 0:
-            log_file.flush()
-        out_q.task_done()
+    async def _request(self, url: str) -> Tuple[int, Optional[str], Optional[str]]:
+        resp = await self.session.get(url)
+        if resp.status_code != 200:
+            return resp.status_code, None, resp.headers.get("Retry-After")
+        return resp.status_code, resp.content.decode("utf-8", "replace"), None
 
 
 # ----------------------------- Вспомогательные функции -----------------------------
 
-def read_existing_ids(csv_path: str) -> set:
+def scan_csv(csv_path: str) -> Tuple[set, int]:
+    """Один проход по CSV: множество уже собранных ID и ID, с которого продолжать."""
     ids = set()
-    if not os.path.exists(csv_path):
-        return ids
-    with open(csv_path, "r", encoding="utf-8-sig") as f:
-        reader = csv.DictReader(f)
-        for row in reader:
-            rid = row.get("id")
-            if rid:
-                ids.add(rid)
-    return ids
-
-
-def get_resume_start(csv_path: str) -> int:
-    if not os.path.exists(csv_path):
-        return 1
     last_id = 0
+    if not os.path.exists(csv_path):
+        return ids, last_id + 1
     with open(csv_path, "r", encoding="utf-8-sig") as f:
-        reader = csv.DictReader(f)
+        # csv.reader вместо DictReader: нужен один столбец, словарь на строку не строим
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if not header or "id" not in header:
+            return ids, last_id + 1
+        id_idx = header.index("id")
         for row in reader:
+            rid = row[id_idx] if len(row) > id_idx else None
+            if not rid:
+                continue
+            ids.add(rid)
             try:
-                last_id = max(last_id, int(row["id"]))
-            except Exception:
+                last_id = max(last_id, int(rid))
+            except ValueError:
                 continue
-    return last_id + 1
+    return ids, last_id + 1
+
 
+# ----------------------------- Пайплайн: producer/consumer -----------------------------
 
-async def producer_worker(worker_idx: int,
-                          stride: int,
-                          fetcher: "Fetcher",
-                          start_id: int,
-                          out_q: "asyncio.Queue[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]",
+async def producer_worker(fetcher: "Fetcher",
+                          ids: Iterator[int],
+                          out_q: "asyncio.Queue[Tuple[int, Optional[GameRow], Optional[str]]]",
                           stop_event: asyncio.Event,
-                          end_id: Optional[int] = None):
-    i = start_id + worker_idx
+                          existing_ids: set,
+                          parse_pool: Optional[Executor] = None):
+    # Все воркеры берут ID из одного общего итератора: медленная страница не тормозит чужие ID.
+    # Останов проверяем до взятия ID, чтобы каждый выданный ID дошёл до консюмера и в порядке не было дыр.
+    loop = asyncio.get_running_loop()
     while not stop_event.is_set():
-        if end_id is not None and i >= end_id:
+        i = next(ids, None)
+        if i is None:
             break
-        url = f"https://howlongtobeat.com/game/{i}"
+        # Уже собранные ID не качаем и не парсим повторно
+        sid = str(i)
+        if sid in existing_ids:
+            await out_q.put((i, DUPLICATE, None))
+            continue
+        url = GAME_URL_PREFIX + sid
         html = await fetcher.fetch_html(url)
         if html is None:
             await out_q.put((i, None, None))
-            await fetcher.polite_sleep()
-            i += stride
             continue
         try:
-            data = parse_hltb_game_from_html(url, html)
+            # Разбор HTML — CPU; уносим его из event loop, чтобы не тормозить загрузки
+            data = await loop.run_in_executor(parse_pool, parse_hltb_game_from_html, url, html, i)
         except Exception as e:
             err = f"{repr(e)}\n{traceback.format_exc()}"
             await out_q.put((i, None, err))
-            await fetcher.polite_sleep()
-            i += stride
             continue
 
         await out_q.put((i, data, None))
-        await fetcher.polite_sleep()
-        i += stride
 
 
-async def consumer(out_q: "asyncio.Queue[Tuple[int, Optional[Dict[str, Any]], Optional[str]]]",
-                   writer: csv.DictWriter,
+async def consumer(out_q: "asyncio.Queue[Tuple[int, Optional[GameRow], Optional[str]]]",
+                   writer,
                    log_file,
                    existing_ids: set,
                    stop_event: asyncio.Event,
                    miss_threshold: int,
                    *,
                    expected_start: int,
-                   end_id: Optional[int]):
-    buffer: Dict[int, Tuple[Optional[Dict[str, Any]], Optional[str]]] = {}
+                   end_id: Optional[int],
+                   id_step: int = 1,
+                   csv_file=None):
+    buffer: Dict[int, Tuple[Optional[GameRow], Optional[str]]] = {}
     expected = expected_start
-    processed = 0
     consecutive_skips = 0
     producers_done = False
+    # Готовые строки копим и пишем пачкой через writerows
+    batch: List[GameRow] = []
 
-    while True:
-        item = await out_q.get()
-        if item is None:
-            producers_done = True
-            out_q.task_done()
-        else:
-            game_id, data, err = item
-            if err:
-                log(f"[ERROR] ID {game_id} — {err}", log_file)
-                buffer[game_id] = (None, None)  # помечаем как пропуск, чтобы не блокировать порядок
-            else:
-                buffer[game_id] = (data, None)
-            out_q.task_done()
+    def flush_batch():
+        if batch:
+            writer.writerows(batch)
+            batch.clear()
+        if csv_file is not None:
+            csv_file.flush()
+        log_file.flush()
 
-        # Пишем непрерывный префикс начиная с expected
+    try:
         while True:
-            entry = buffer.pop(expected, None)
-            if entry is None:
-                break
-
-            data, _ = entry
-            if data is None:
-                consecutive_skips += 1
-                log(f"[SKIP]  ID {expected} — нет данных или 404 (streak={consecutive_skips}/{miss_threshold})", log_file)
-                if consecutive_skips >= miss_threshold and not stop_event.is_set():
-                    log(f"[STOP]  Достигнут порог подряд: {miss_threshold} пропусков. Останов.", log_file)
-                    stop_event.set()
+            item = await out_q.get()
+            if item is None:
+                producers_done = True
+                out_q.task_done()
             else:
-                consecutive_skips = 0
-                if data["id"] in existing_ids:
-                    log(f"[DUP]   ID {expected} — пропущен (уже есть в CSV)", log_file)
+                game_id, data, err = item
+                if err:
+                    log(f"[ERROR] ID {game_id} — {err}", log_file)
+                    buffer[game_id] = (None, None)  # помечаем как пропуск, чтобы не блокировать порядок
+                else:
+                    buffer[game_id] = (data, None)
+                out_q.task_done()
+
+            # Пишем непрерывный префикс начиная с expected (с шагом id_step при шардировании)
+            while True:
+                entry = buffer.pop(expected, None)
+                if entry is None:
+                    break
+
+                data, _ = entry
+                if data is None:
+                    consecutive_skips += 1
+                    log(f"[SKIP]  ID {expected} — нет данных или 404 (streak={consecutive_skips}/{miss_threshold})", log_file)
+                    if consecutive_skips >= miss_threshold and not stop_event.is_set():
+                        log(f"[STOP]  Достигнут порог подряд: {miss_threshold} пропусков. Останов.", log_file)
+                        stop_event.set()
+                        flush_batch()
                 else:
-                    writer.writerow(data)
-                    existing_ids.add(data["id"])
-                    processed += 1
-                    if processed % 100 == 0:
-                        log_file.flush()
-                    log(f"[OK]    ID {expected} — {data.get('name')}", log_file)
-
-            expected += 1
-            if end_id is not None and expected >= end_id:
-                buffer.clear()
+                    consecutive_skips = 0
+                    if data is DUPLICATE or data.id in existing_ids:
+                        log(f"[DUP]   ID {expected} — пропущен (уже есть в CSV)", log_file)
+                    else:
+                        batch.append(data)
+                        if len(batch) >= WRITE_BATCH_SIZE:
+                            flush_batch()
+                        existing_ids.add(data.id)
+                        log(f"[OK]    ID {expected} — {data.name}", log_file)
+
+                expected += id_step
+                if end_id is not None and expected >= end_id:
+                    buffer.clear()
+                    break
+
+            if producers_done and not buffer:
                 break
-
-        if producers_done and not buffer:
-            break
+    finally:
+        flush_batch()
 
 
 # ----------------------------- Точка входа -----------------------------
 
+def shard_path(path: str, shard_idx: int, shards: int) -> str:
+    """hltb_dataset.csv -> hltb_dataset.shard0of4.csv; без шардирования путь не меняется."""
+    if shards <= 1:
+        return path
+    base, ext = os.path.splitext(path)
+    return f"{base}.shard{shard_idx}of{shards}{ext}"
+
 
 async def main_async(args):
-    csv_path = args.csv
-    log_path = args.log
+    csv_path = shard_path(args.csv, args.shard_idx, args.shards)
+    log_path = shard_path(args.log, args.shard_idx, args.shards)
     concurrency = max(1, args.concurrency)
     workers = max(1, getattr(args, "workers", None) or concurrency)
 
-    # если хочешь жёстко ограничить воркеров семафором Fetcher:
+    # воркеров больше, чем соединений, держать нет смысла
     workers = min(workers, concurrency)
 
     file_exists = os.path.exists(csv_path)
-    existing_ids = read_existing_ids(csv_path)
+    existing_ids, resume_start = scan_csv(csv_path)
 
     if args.start is not None and args.start > 0:
         start_id = args.start
     else:
-        start_id = get_resume_start(csv_path)
+        start_id = resume_start
+
+    # Разбор страниц — в пуле процессов; на одном ядре хватит потоков event loop
+    parse_procs = args.parse_procs if args.parse_procs is not None else (os.cpu_count() or 1)
 
     infinite = isinstance(args.count, str) and args.count.strip() == "*"
     end_id = None if infinite else start_id + max(0, int(args.count))
+    # Шард берёт только ID с i % shards == shard_idx; выравниваем старт на первый такой ID
+    first_id = start_id + (args.shard_idx - start_id) % args.shards
 
-    connector = aiohttp.TCPConnector(
-        limit=concurrency * 4,
-        limit_per_host=concurrency,
-        ttl_dns_cache=300
-    )
     headers = {
         "User-Agent": USER_AGENT,
         "Accept-Language": "en-US,en;q=0.9",
         "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
         "Connection": "keep-alive",
     }
+    # Число одновременных запросов ограничивает сам клиент, темп — RateLimiter
+    if args.http2:
+        session_cm = httpx.AsyncClient(
+            http2=True,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency,
+                                keepalive_expiry=KEEPALIVE_TIMEOUT),
+            timeout=30,
+            follow_redirects=True,  # как aiohttp по умолчанию
+            headers={k: v for k, v in headers.items() if k != "Connection"},  # в HTTP/2 запрещён
+        )
+        fetcher_cls = HttpxFetcher
+    else:
+        connector = aiohttp.TCPConnector(
+            limit=concurrency,
+            limit_per_host=concurrency,
+            ttl_dns_cache=300,
+            keepalive_timeout=KEEPALIVE_TIMEOUT
+        )
+        session_cm = aiohttp.ClientSession(headers=headers, connector=connector, read_bufsize=READ_BUFSIZE)
+        fetcher_cls = Fetcher
 
     out_q: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 8)
     stop_event = asyncio.Event()
     miss_threshold = int(args.miss_threshold)
 
-    with open(csv_path, "a", newline="", encoding="utf-8-sig") as f_csv, \
-         open(log_path, "a", encoding="utf-8") as f_log:
+    # ExitStack закрывает файлы и гасит пул процессов при любой ошибке, в том числе до старта задач
+    with contextlib.ExitStack() as stack:
+        f_csv = stack.enter_context(open(csv_path, "a", newline="", encoding="utf-8-sig", buffering=CSV_BUFFER_SIZE))
+        f_log = stack.enter_context(open(log_path, "a", encoding="utf-8"))
 
-        writer = csv.DictWriter(
+        parse_pool = None
+        if parse_procs > 1:
+            # Пул создаётся внутри работающего loop, когда уже живут потоки резолвера и executor'а:
+            # fork такого процесса может повиснуть, поэтому воркеры стартуют через forkserver/spawn
+            start_method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+            parse_pool = ProcessPoolExecutor(max_workers=parse_procs, mp_context=multiprocessing.get_context(start_method))
+            stack.callback(parse_pool.shutdown, cancel_futures=True)
+
+        writer = csv.writer(
             f_csv,
-            fieldnames=CSV_HEADERS,
             quoting=csv.QUOTE_ALL,
             escapechar='\\'
         )
         if not file_exists:
-            writer.writeheader()
+            writer.writerow(CSV_HEADERS)
 
         mode = "*" if infinite else f"{int(args.count)}"
-        log(f"[RESUME] start_id={start_id} mode={mode} concurrency={concurrency} workers={workers} miss_threshold={miss_threshold}", f_log)
+        log(f"[RESUME] start_id={start_id} mode={mode} shard={args.shard_idx}/{args.shards} concurrency={concurrency} workers={workers} rate={args.rate} miss_threshold={miss_threshold}", f_log)
 
-        async with aiohttp.ClientSession(headers=headers, connector=connector) as session:
-            fetcher = Fetcher(session=session, log_file=f_log, concurrency=concurrency)
+        async with session_cm as session:
+            limiter = RateLimiter(rate=args.rate)
+            fetcher = fetcher_cls(session=session, log_file=f_log, limiter=limiter)
 
-            # пул продьюсеров с шагом по ID = workers
+            # пул продьюсеров над общей очередью ID
+            ids = (itertools.count(first_id, args.shards) if end_id is None
+                   else iter(range(first_id, end_id, args.shards)))
             prod_tasks = [
-                asyncio.create_task(
-                    producer_worker(idx, workers, fetcher, start_id, out_q, stop_event, end_id=end_id)
-                )
-                for idx in range(workers)
+                asyncio.create_task(producer_worker(fetcher, ids, out_q, stop_event, existing_ids, parse_pool=parse_pool))
+                for _ in range(workers)
             ]
 
             # упорядоченный консюмер
             cons_task = asyncio.create_task(
                 consumer(
                     out_q, writer, f_log, existing_ids, stop_event, miss_threshold,
-                    expected_start=start_id, end_id=end_id
+                    expected_start=first_id, end_id=end_id, id_step=args.shards, csv_file=f_csv
                 )
             )
 
+            log_flusher = asyncio.create_task(flush_log_periodically(f_log))
+
             try:
                 # ждём всех продьюсеров
                 await asyncio.gather(*prod_tasks)
@@ -816,7 +1017,7 @@ async def main_async(args):
                 stop_event.set()
                 await out_q.put(None)
             finally:
-                for t in prod_tasks:
+                for t in [*prod_tasks, log_flusher]:
                     if not t.done():
                         t.cancel()
                         with contextlib.suppress(asyncio.CancelledError):
@@ -830,16 +1031,33 @@ def main():
                         help='сколько ID обработать подряд. Число или "*" для режима без верхней границы с автостопом')
     parser.add_argument("--start", type=int, default=None, help="стартовый ID; если не задан, берётся из CSV")
     parser.add_argument("--concurrency", type=int, default=8, help="число одновременных запросов; дефолт 8")
+    parser.add_argument("--rate", type=float, default=DEFAULT_RATE,
+                        help=f"максимум запросов в секунду; дефолт {DEFAULT_RATE:g}")
+    parser.add_argument("--http2", action="store_true",
+                        help="ходить через httpx с HTTP/2 (нужен пакет httpx[http2]); по умолчанию aiohttp")
     parser.add_argument("--workers", type=int, default=None,
                         help="число параллельных воркеров по ID; по умолчанию = concurrency")
+    parser.add_argument("--parse-procs", type=int, default=None,
+                        help="число процессов для разбора HTML; по умолчанию = число CPU, 1 — без процессов")
+    parser.add_argument("--shards", type=int, default=1,
+                        help="на сколько процессов делится диапазон ID; каждый пишет свой CSV и лог с суффиксом .shardIofK")
+    parser.add_argument("--shard-idx", type=int, default=0,
+                        help="номер шарда 0..shards-1: обрабатываются ID с id %% shards == shard-idx; дефолт 0")
     parser.add_argument("--csv", type=str, default=DEFAULT_CSV_PATH, help=f"путь к CSV; дефолт {DEFAULT_CSV_PATH}")
     parser.add_argument("--log", type=str, default=DEFAULT_LOG_PATH, help=f"путь к логу; дефолт {DEFAULT_LOG_PATH}")
     parser.add_argument("--miss-threshold", type=int, default=400,
                         help="порог подряд для 'нет данных/404' в режиме '*'; дефолт 400")
     args = parser.parse_args()
-
+    if args.shards < 1 or not 0 <= args.shard_idx < args.shards:
+        parser.error("--shard-idx должен быть в диапазоне [0, --shards)")
+    if args.rate <= 0:
+        parser.error("--rate должен быть больше нуля")
+    if args.http2 and (importlib.util.find_spec("httpx") is None or importlib.util.find_spec("h2") is None):
+        parser.error("--http2 требует установленного пакета httpx[http2]")
+
+    run = uvloop.run if uvloop is not None else asyncio.run
     try:
-        asyncio.run(main_async(args))
+        run(main_async(args))
     except Exception as e:
         sys.stderr.write(f"Fatal: {repr(e)}\n")
         sys.stderr.write(traceback.format_exc() + "\n")
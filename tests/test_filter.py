@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""Движки filter.py должны одинаково обрабатывать CSV с лишними столбцами."""
+
+import csv
+import importlib.util
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+import pyarrow.csv as pv
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import filter as hltb_filter  # noqa: E402
+
+HEADERS = [
+    "id", "name", "type", "platform", "genres", "developer", "publisher",
+    "release_date", "release_precision", "release_year", "release_month", "release_day",
+    *[c for t in hltb_filter.TIME_COLS for c in (f"{t}_polled", t)],
+    "source_url", "crawled_at",
+]
+
+
+def make_row(i: int) -> dict:
+    row = {h: "" for h in HEADERS}
+    row.update({
+        "id": str(i),
+        "name": f"Game {i}",
+        "type": "game",
+        "platform": "PS4, PC" if i % 2 else "PC (Windows)",
+        "genres": "RPG, Strategy",
+        "release_date": "2015",
+        "release_precision": "year",
+        "release_year": "2015",
+        "source_url": f"https://howlongtobeat.com/game/{i}",
+        "crawled_at": "2025-08-15T12:59:26Z",
+    })
+    if i % 5:  # каждая пятая строка без метрик — фильтр её отбросит
+        row["main_story"] = "4" if i % 2 else "12.5"
+        row["main_story_polled"] = str(i * 10)
+    return row
+
+
+class EngineExtraColumnTest(unittest.TestCase):
+    """Лишний целочисленный столбец не должен ронять ни один движок."""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = Path(self.tmp.name)
+        self.src = self.dir / "src.csv"
+        with open(self.src, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=HEADERS + ["extra_num"], quoting=csv.QUOTE_ALL)
+            writer.writeheader()
+            for i in range(1, 21):
+                writer.writerow({**make_row(i), "extra_num": str(i * 7)})
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def run_engine(self, engine: str, fmt: str) -> tuple:
+        out = self.dir / f"{engine}_{fmt}"
+        out.mkdir()
+        suffix = hltb_filter.OUTPUT_SUFFIXES[fmt]
+        p_norm = out / f"normalized{suffix}"
+        p_filt = out / f"filtered{suffix}"
+        if engine == "pyarrow":
+            counts = hltb_filter.run_pyarrow(self.src, p_norm, p_filt, fmt)
+        elif engine == "polars":
+            counts = hltb_filter.run_polars(self.src, p_norm, p_filt, fmt)
+        else:
+            # маленький чанк — чтобы проверить и приведение следующих чанков к схеме первого
+            counts = hltb_filter.run_pandas(self.src, p_norm, p_filt, 3, fmt)
+        return counts, p_norm, p_filt
+
+    def engines(self) -> list:
+        engines = ["pyarrow", "pandas"]
+        if importlib.util.find_spec("polars") is not None:
+            engines.append("polars")
+        return engines
+
+    def test_csv_output_matches_across_engines(self):
+        results = {e: self.run_engine(e, "csv") for e in self.engines()}
+        ref_counts, ref_norm, ref_filt = results["pyarrow"]
+        self.assertEqual(ref_counts, (20, 16))
+        self.assertEqual(pv.read_csv(ref_filt).column("extra_num").to_pylist()[:2], [7, 14])
+        for engine, (counts, p_norm, p_filt) in results.items():
+            with self.subTest(engine=engine):
+                self.assertEqual(counts, ref_counts)
+                self.assertEqual(p_norm.read_bytes(), ref_norm.read_bytes())
+                self.assertEqual(p_filt.read_bytes(), ref_filt.read_bytes())
+
+    def test_binary_output_matches_across_engines(self):
+        import pyarrow.feather as pf
+        import pyarrow.parquet as pq
+
+        for fmt, read in (("parquet", pq.read_table), ("feather", pf.read_table)):
+            results = {e: self.run_engine(e, fmt) for e in self.engines()}
+            ref = [read(p) for p in results["pyarrow"][1:]]
+            for engine, (_, p_norm, p_filt) in results.items():
+                for got, want in zip((read(p_norm), read(p_filt)), ref):
+                    with self.subTest(engine=engine, fmt=fmt):
+                        # и данные, и схема с метаданными: формат вывода не зависит от --engine
+                        self.assertTrue(got.schema.equals(want.schema, check_metadata=True))
+                        self.assertTrue(got.equals(want))
+
+
+if __name__ == "__main__":
+    unittest.main()